@@ -6,10 +6,36 @@ Fixes: Better price extraction, removes currency symbols properly
 import re
 import json
 import asyncio
+import logging
 import subprocess
 from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig
 from droid_runner import DroidRunRunner
 
+logger = logging.getLogger(__name__)
+
+# Precompiled patterns - these run on every captured agent output
+# Combined tag + fallback-price alternation: one forward pass over the
+# (potentially large) captured output finds both in a single scan
+_COMBINED_RE = re.compile(
+    r'<request_accomplished[^>]*success="([^"]+)"[^>]*>([^<]+)</request_accomplished>'
+    r'|price["\s:]+[₹Rs.\s]*(\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)',
+    re.DOTALL | re.IGNORECASE
+)
+_NUM_RE = re.compile(r'\d+(?:\.\d+)?')
+# C-level delete of currency symbols/commas/whitespace before the
+# number search - commas are grouping ("₹1,299"), not delimiters
+_PRICE_STRIP_TABLE = str.maketrans('', '', '₹Rs,$€£ \t\n\r')
+# All fallback fields in one alternation - a single finditer pass over
+# the text instead of one re.search per field. The name group is lazy
+# with a lookahead stop so it can't swallow a following "weight"/
+# "price" key in plain-text output like "name: Tomatoes weight: 500g"
+_FIELDS_RE = re.compile(
+    r'(?:price["\s:]+[₹Rs.\s]*(?P<price>\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?))'
+    r'|(?:name["\s:]+(?P<name>[a-zA-Z0-9\s]+?)(?=\s*(?:weight|price)["\s:]|[^a-zA-Z0-9\s]|$))'
+    r'|(?:weight["\s:]+(?P<weight>[0-9.]+\s*(?:kg|g|l|ml|gm)))',
+    re.IGNORECASE
+)
+
 class AppNavigator:
     def __init__(self, llm, max_steps=20):
         self.llm = llm
@@ -39,7 +65,16 @@ class AppNavigator:
             "Blinkit": "com.grofers.customerapp",
             "Zepto": "com.zepto.app",
         }
-        
+
+        # Serializes ADB access when platform checks run concurrently
+        # (single shared device - interleaved force-stops cause ghost clicks)
+        self._adb_lock = asyncio.Lock()
+
+        # Persistent adb shell - opened lazily on first force-stop.
+        # Writing to its stdin (~1ms) beats fork+exec+adb handshake
+        # (~30-80ms) for every close_app/timeout cleanup
+        self._adb_shell = None
+
         print("✅ App Navigator initialized (Anti-Zombie + Anti-Ghost)")
     
     async def force_home_reset(self):
@@ -52,8 +87,45 @@ class AppNavigator:
         )
         await asyncio.sleep(1.0)
     
-    def _adb_force_stop(self, package: str):
-        """Force-stop app via ADB"""
+    def _open_adb_shell(self):
+        """Open (or reopen) the persistent adb shell"""
+        try:
+            self._adb_shell = subprocess.Popen(
+                ["adb", "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                bufsize=0
+            )
+        except Exception as e:
+            print(f"⚠️ Could not open persistent adb shell: {e}")
+            self._adb_shell = None
+
+    async def _adb_force_stop(self, package: str):
+        """Force-stop app via ADB (serialized - shared device)"""
+        async with self._adb_lock:
+            if self._adb_shell is None or self._adb_shell.poll() is not None:
+                self._open_adb_shell()
+
+            if self._adb_shell is not None:
+                try:
+                    self._adb_shell.stdin.write(f"am force-stop {package}\n".encode())
+                    self._adb_shell.stdin.flush()
+                    # The shell hasn't executed the command yet and its
+                    # exit status is never read on this path - only the
+                    # one-shot fallback below verifies the returncode,
+                    # so don't claim completion here
+                    print(f"📨 Dispatched force-stop for {package}")
+                    return
+                except Exception as e:
+                    print(f"⚠️ Persistent adb shell error: {e} - using one-shot adb")
+                    self._adb_shell = None
+
+            # Fallback: one-shot adb invocation
+            self._adb_force_stop_sync(package)
+
+    def _adb_force_stop_sync(self, package: str):
+        """Force-stop app via one-shot ADB process"""
         try:
             result = subprocess.run(
                 ["adb", "shell", "am", "force-stop", package],
@@ -75,7 +147,7 @@ class AppNavigator:
         # Force-stop the app process
         package = self.app_packages.get(platform_name)
         if package:
-            self._adb_force_stop(package)
+            await self._adb_force_stop(package)
         
         # Go home
         await self.runner.run(
@@ -89,9 +161,7 @@ class AppNavigator:
         """
         Main price checking method - runs complete flow for one platform
         """
-        print(f"\n{'='*60}")
-        print(f"🛒 CHECKING: {platform_name.upper()}")
-        print(f"{'='*60}")
+        logger.info("\n%s\n🛒 CHECKING: %s\n%s", '='*60, platform_name.upper(), '='*60)
         
         # 1. Reset UI state
         await self.force_home_reset()
@@ -126,9 +196,9 @@ class AppNavigator:
         
         # 5. Handle timeout
         if isinstance(err, asyncio.TimeoutError):
-            print(f"⚠️ TIMEOUT: {platform_name} took too long (>120s)")
+            logger.warning("⚠️ TIMEOUT: %s took too long (>120s)", platform_name)
             if package:
-                self._adb_force_stop(package)
+                await self._adb_force_stop(package)
             return {
                 "status": "error",
                 "note": "App Timeout",
@@ -137,9 +207,9 @@ class AppNavigator:
         
         # 6. Handle errors
         if err:
-            print(f"⚠️ Agent error: {err}")
+            logger.warning("⚠️ Agent error: %s", err)
             if package:
-                self._adb_force_stop(package)
+                await self._adb_force_stop(package)
             return {
                 "status": "error",
                 "note": str(err)[:100],
@@ -148,23 +218,23 @@ class AppNavigator:
         
         # 7. Parse output
         if not output_text:
-            print("⚠️ No output captured")
+            logger.warning("⚠️ No output captured")
             return {
                 "status": "error",
                 "note": "No output",
                 "platform": platform_name
             }
         
-        print(f"📋 Captured {len(output_text)} chars of output")
+        logger.info("📋 Captured %d chars of output", len(output_text))
         
         # 8. Extract structured data
         result = self._extract_data_from_output(output_text, platform_name)
         
         # 9. Display result
         if result.get('price'):
-            print(f"✅ {platform_name}: ₹{result['price']} - {result.get('name', 'N/A')}")
+            logger.info("✅ %s: ₹%s - %s", platform_name, result['price'], result.get('name', 'N/A'))
         else:
-            print(f"❌ {platform_name}: {result.get('note', 'No price found')}")
+            logger.info("❌ %s: %s", platform_name, result.get('note', 'No price found'))
         
         return result
     
@@ -173,10 +243,16 @@ class AppNavigator:
         if not output_text:
             return {"status": "error", "note": "No output", "platform": platform}
         
-        # Look for request_accomplished tags
-        pattern = r'<request_accomplished[^>]*success="([^"]+)"[^>]*>([^<]+)</request_accomplished>'
-        matches = re.findall(pattern, output_text, re.DOTALL | re.IGNORECASE)
-        
+        # Single pass: collect request_accomplished tags and remember the
+        # first loose price mention in case no tag parses
+        matches = []
+        fallback_price = None
+        for m in _COMBINED_RE.finditer(output_text):
+            if m.group(1) is not None:
+                matches.append((m.group(1), m.group(2)))
+            elif fallback_price is None:
+                fallback_price = m.group(3)
+
         if matches:
             # Take the last match
             for success, content in reversed(matches):
@@ -212,9 +288,9 @@ class AppNavigator:
                     if result.get('price'):
                         return result
         
-        # Fallback: Look for price in raw text
-        if "price" in output_text.lower():
-            result = self._parse_text_fallback(output_text, platform)
+        # Fallback: price already spotted during the single pass
+        if fallback_price is not None:
+            result = self._parse_text_fallback(output_text, platform, price_hint=fallback_price)
             if result.get('price'):
                 return result
         
@@ -231,42 +307,39 @@ class AppNavigator:
         """
         if not price:
             return None
-        
-        price_str = str(price)
-        
-        # Remove all currency symbols and non-numeric chars except decimal
-        cleaned = re.sub(r'[₹Rs,\s$€£]', '', price_str)
-        cleaned = re.sub(r'[^\d.]', '', cleaned)
-        
-        # Validate
-        try:
-            float(cleaned)
-            return cleaned
-        except (ValueError, TypeError):
-            return None
+
+        # Delete currency symbols / grouping commas first so "₹1,299"
+        # yields "1299", then grab the first decimal number. No float()
+        # validation round-trip.
+        match = _NUM_RE.search(str(price).translate(_PRICE_STRIP_TABLE))
+        return match.group(0) if match else None
     
-    def _parse_text_fallback(self, text: str, platform: str) -> dict:
-        """Fallback regex-based extraction when JSON parsing fails"""
+    def _parse_text_fallback(self, text: str, platform: str, price_hint: str = None) -> dict:
+        """
+        Fallback regex-based extraction when JSON parsing fails.
+        One named-group pass collects price/name/weight together;
+        price_hint carries a price the caller already spotted during
+        its own pass over the text.
+        """
         data = {"platform": platform}
-        
-        # Extract price - IMPROVED to remove currency symbols immediately
-        # Matches: ₹31, 31, Rs. 31, Rs 31, etc.
-        price_match = re.search(r'(?:price["\s:]+)?[₹Rs.\s]*(\d+(?:\.\d{1,2})?)', text, re.IGNORECASE)
-        if price_match:
-            # Extract only numeric part
-            raw_price = price_match.group(1)
-            data['price'] = self._clean_price_value(raw_price)
+        fields = {"price": price_hint, "name": None, "weight": None}
+
+        for m in _FIELDS_RE.finditer(text):
+            group = m.lastgroup
+            if group and fields[group] is None:
+                fields[group] = m.group(group)
+                if all(v is not None for v in fields.values()):
+                    break
+
+        if fields['price'] is not None:
+            data['price'] = self._clean_price_value(fields['price'])
             if data['price']:
                 data['status'] = 'found'
-        
-        # Extract name
-        name_match = re.search(r'name["\s:]+([a-zA-Z0-9\s]+)', text, re.IGNORECASE)
-        if name_match:
-            data['name'] = name_match.group(1).strip()
-        
-        # Extract weight
-        weight_match = re.search(r'weight["\s:]+([0-9.]+\s*(?:kg|g|l|ml|gm))', text, re.IGNORECASE)
-        if weight_match:
-            data['weight'] = weight_match.group(1)
-        
+
+        if fields['name']:
+            data['name'] = fields['name'].strip()
+
+        if fields['weight']:
+            data['weight'] = fields['weight']
+
         return data if data.get('price') else {"status": "error", "platform": platform}
\ No newline at end of file
@@ -7,21 +7,47 @@ import os
 from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
-load_dotenv()
+# Parse .env once per process, even if this module is imported twice
+_DOTENV_LOADED = False
 
-@dataclass
+def _load_dotenv_once():
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv()
+        _DOTENV_LOADED = True
+
+_load_dotenv_once()
+
+# Env vars read once at import - BotConfig() construction reuses these
+# instead of hitting os.environ per instance
+_GEMINI_KEY = os.getenv("GOOGLE_API_KEY", "")
+_ANALYZER_MODEL = os.getenv("GEMINI_ANALYZER_MODEL", "gemini-1.5-flash")
+_DROIDRUN_MODEL = os.getenv("GEMINI_DROIDRUN_MODEL", "gemini-1.5-flash")
+
+# One shared immutable platform tuple - every config field references
+# this instead of allocating its own list per construction
+_GROCERY_PLATFORMS = ("Blinkit", "Zepto")
+
+# validate() stability notes - one hash probe on the exact model name
+# instead of chained substring scans
+_MODEL_NOTES = {
+    "gemini-1.5-flash": "✅ Using stable gemini-1.5-flash (no 404 errors)",
+    "gemini-2.0-flash-exp": "⚠️ Using experimental model - may get 404 if not available",
+}
+
+@dataclass(slots=True)
 class PlatformConfig:
     """Platform-specific app package names"""
     BLINKIT: str = "com.grofers.customerapp"
     ZEPTO: str = "com.zeptoconsumerapp"  # FIXED: Correct package name from terminal log
 
-@dataclass
+@dataclass(slots=True)
 class CategoryPlatforms:
     """Platform mapping - focused on groceries"""
-    groceries: list = field(default_factory=lambda: ["Blinkit", "Zepto"])
-    default: list = field(default_factory=lambda: ["Blinkit", "Zepto"])
+    groceries: tuple = field(default_factory=lambda: _GROCERY_PLATFORMS)
+    default: tuple = field(default_factory=lambda: _GROCERY_PLATFORMS)
 
-@dataclass
+@dataclass(slots=True)
 class TimeoutConfig:
     """Timeout settings for different operations"""
     platform_check: int = 180
@@ -30,12 +56,12 @@ class TimeoutConfig:
     reset_home: int = 15
     close_app: int = 10
 
-@dataclass
+@dataclass(slots=True)
 class BotConfig:
     """Main bot configuration"""
     
     # ===== API Keys =====
-    gemini_api_key: str = field(default_factory=lambda: os.getenv("GOOGLE_API_KEY", ""))
+    gemini_api_key: str = field(default_factory=lambda: _GEMINI_KEY)
     
     # ===== Model Configuration =====
     # FIXED: Use stable models that are guaranteed to exist
@@ -44,14 +70,14 @@ class BotConfig:
     #   - gemini-1.5-pro (more capable but slower)
     #   - gemini-2.0-flash-exp (experimental, may not be available)
     gemini_analyzer_model: str = field(
-        default_factory=lambda: os.getenv("GEMINI_ANALYZER_MODEL", "gemini-1.5-flash")  # FIXED: Changed to stable model
+        default_factory=lambda: _ANALYZER_MODEL  # FIXED: Changed to stable model
     )
     
     # For llama_index.llms.google_genai (droidrun):
     #   - models/gemini-1.5-flash ✅ RECOMMENDED
     #   - models/gemini-1.5-pro
     gemini_droidrun_model: str = field(
-        default_factory=lambda: os.getenv("GEMINI_DROIDRUN_MODEL", "gemini-1.5-flash")  # FIXED: Changed to stable model
+        default_factory=lambda: _DROIDRUN_MODEL  # FIXED: Changed to stable model
     )
     
     # ===== WhatsApp Settings =====
@@ -66,7 +92,7 @@ class BotConfig:
     # ===== Platform Mappings =====
     platforms: PlatformConfig = field(default_factory=PlatformConfig)
     category_platforms: CategoryPlatforms = field(default_factory=CategoryPlatforms)
-    grocery_platforms: list = field(default_factory=lambda: ["Blinkit", "Zepto"])
+    grocery_platforms: tuple = field(default_factory=lambda: _GROCERY_PLATFORMS)
     
     # ===== Timing & Delays =====
     rate_limit_delay: int = 4
@@ -75,7 +101,16 @@ class BotConfig:
     # ===== Feature Flags =====
     use_adb_force_stop: bool = True
     capture_trajectories: bool = True
-    
+
+    # Built in __post_init__ - maps lowercase platform name to package
+    _package_map: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self._package_map = {
+            "blinkit": self.platforms.BLINKIT,
+            "zepto": self.platforms.ZEPTO,
+        }
+
     def validate(self):
         """Validate configuration"""
         errors = []
@@ -86,48 +121,60 @@ class BotConfig:
         if not self.chat_name or self.chat_name == "YourChatName":
             errors.append("Please set a valid chat_name in config.py")
         
-        # Model info
-        print("\n📋 Model Configuration:")
-        print(f"   Analyzer Model: {self.gemini_analyzer_model}")
-        print(f"   DroidRun Model: {self.gemini_droidrun_model}")
-        
-        if "1.5-flash" in self.gemini_analyzer_model:
-            print("   ✅ Using stable gemini-1.5-flash (no 404 errors)")
-        elif "2.0-flash-exp" in self.gemini_analyzer_model:
-            print("   ⚠️ Using experimental model - may get 404 if not available")
+        # Model info - one batched write instead of a print per line,
+        # and skipped entirely on quiet runs
+        if self.debug_mode:
+            lines = [
+                "\n📋 Model Configuration:",
+                f"   Analyzer Model: {self.gemini_analyzer_model}",
+                f"   DroidRun Model: {self.gemini_droidrun_model}",
+            ]
+            note = _MODEL_NOTES.get(self.gemini_analyzer_model.removeprefix("models/"))
+            if note:
+                lines.append(f"   {note}")
+            print("\n".join(lines))
         
         if errors:
             error_msg = "\n".join([f"❌ {e}" for e in errors])
             raise ValueError(f"\nConfiguration Errors:\n{error_msg}")
         
-        print("✅ Configuration validated\n")
+        if self.debug_mode:
+            print("✅ Configuration validated\n")
         return True
     
-    def get_platforms_for_category(self, category: str) -> list:
-        """Get relevant platforms"""
-        if category.lower() in ['groceries', 'grocery', 'food', 'vegetables', 'fruits']:
-            return self.grocery_platforms
+    def get_platforms_for_category(self, category: str) -> tuple:
+        """
+        Get relevant platforms. Every category maps to the grocery
+        platforms today, so this is a direct O(1) return - no per-call
+        lowercasing or list membership scan. If per-category platform
+        sets ever return, use a dict[str, tuple] built once at import.
+        """
         return self.grocery_platforms
     
     def get_app_package(self, platform_name: str) -> str:
-        """Get app package name for platform"""
-        return getattr(self.platforms, platform_name.upper().replace(" ", "_"), "")
+        """Get app package name for platform - single dict probe"""
+        return self._package_map.get(platform_name.lower(), "")
     
     def print_config_summary(self):
-        """Print configuration summary"""
-        print("="*60)
-        print("CONFIGURATION SUMMARY")
-        print("="*60)
-        print(f"Chat Name: {self.chat_name}")
-        print(f"Analyzer Model: {self.gemini_analyzer_model}")
-        print(f"DroidRun Model: {self.gemini_droidrun_model}")
-        print(f"Max Steps (Full): {self.max_steps}")
-        print(f"Max Steps (Fast): {self.max_steps_fast}")
-        print(f"Platforms: {', '.join(self.grocery_platforms)}")
-        print(f"Platform Timeout: {self.timeouts.platform_check}s")
-        print(f"WhatsApp Send Timeout: {self.timeouts.whatsapp_send}s")
-        print(f"Use ADB Force-Stop: {self.use_adb_force_stop}")
-        print("="*60 + "\n")
+        """Print configuration summary (debug runs only) as one write"""
+        if not self.debug_mode:
+            return
+        sep = "=" * 60
+        print("\n".join([
+            sep,
+            "CONFIGURATION SUMMARY",
+            sep,
+            f"Chat Name: {self.chat_name}",
+            f"Analyzer Model: {self.gemini_analyzer_model}",
+            f"DroidRun Model: {self.gemini_droidrun_model}",
+            f"Max Steps (Full): {self.max_steps}",
+            f"Max Steps (Fast): {self.max_steps_fast}",
+            f"Platforms: {', '.join(self.grocery_platforms)}",
+            f"Platform Timeout: {self.timeouts.platform_check}s",
+            f"WhatsApp Send Timeout: {self.timeouts.whatsapp_send}s",
+            f"Use ADB Force-Stop: {self.use_adb_force_stop}",
+            sep + "\n",
+        ]))
 
 # Global config instance
 config = BotConfig()
@@ -4,23 +4,125 @@ DroidRun Safe Runner - Production v2.2
 Fixes: WorkflowHandler TypeError + proper cancellation
 """
 import asyncio
-import io
-import sys
+import contextlib
+from collections import deque
 from typing import Optional, Tuple
 from droidrun import DroidAgent
 
+class SentinelCapture:
+    """
+    stdout sink that scans each completed line for the
+    <request_accomplished> sentinel while the agent is still running.
+    When a complete sentinel region is seen, callers get just that
+    region instead of regex-scanning the full (possibly hundreds of KB)
+    agent log.
+
+    Plain slotted class rather than io.StringIO: appending chunks to a
+    bounded deque is cheaper than StringIO's resizable buffer for the
+    many small writes print() produces, and caps memory for the
+    no-sentinel fallback - a rich-text agent run can emit megabytes,
+    of which only the tail is ever useful to parse.
+    """
+
+    __slots__ = ('_parts', '_pending', '_sentinel_parts', '_in_sentinel')
+
+    # Most recent write chunks kept for the getvalue() fallback, and a
+    # byte cap on the reassembled tail - the sentinel is emitted late
+    # in the run, so parsers never need more than the log's tail
+    _TAIL_CHUNKS = 4096
+    _TAIL_BYTES = 16384
+
+    # Library code (rich-text logging in particular) probes sys.stdout
+    # for terminal-ness and encoding during captured runs
+    encoding = 'utf-8'
+
+    def __init__(self):
+        self._parts = deque(maxlen=self._TAIL_CHUNKS)
+        self._pending = ''
+        self._sentinel_parts = []
+        self._in_sentinel = False
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+    def flush(self):
+        pass
+
+    def write(self, s: str) -> int:
+        self._parts.append(s)
+        self._pending += s
+        # Rich-style status redraws end lines with \r, not \n - treat
+        # both as terminators so those writers don't stall the scanner
+        if '\r' in self._pending:
+            self._pending = self._pending.replace('\r', '\n')
+        while '\n' in self._pending:
+            line, self._pending = self._pending.split('\n', 1)
+            self._scan_line(line)
+        # A writer that never emits a line break must not grow the
+        # partial-line buffer past the same cap as the chunk tail
+        if len(self._pending) > self._TAIL_BYTES:
+            self._pending = self._pending[-self._TAIL_BYTES:]
+        return len(s)
+
+    def _scan_line(self, line: str):
+        if not self._in_sentinel:
+            if '<request_accomplished' not in line:
+                return
+            self._in_sentinel = True
+        self._sentinel_parts.append(line + '\n')
+        if '</request_accomplished>' in line:
+            self._in_sentinel = False
+
+    def flush_pending(self):
+        """Scan a trailing partial line (no newline at end of output)"""
+        if self._pending:
+            self._scan_line(self._pending)
+            self._pending = ''
+
+    @property
+    def result_text(self) -> Optional[str]:
+        """Complete sentinel region(s), or None if none were seen"""
+        if self._sentinel_parts and not self._in_sentinel:
+            return ''.join(self._sentinel_parts)
+        return None
+
+    def getvalue(self) -> str:
+        """Captured output tail (StringIO-compatible interface)"""
+        # Walk chunks from the right until the byte cap is covered -
+        # no point joining (or later regex-scanning) the whole deque
+        # when only the tail is ever parsed
+        tail = []
+        size = 0
+        for part in reversed(self._parts):
+            tail.append(part)
+            size += len(part)
+            if size >= self._TAIL_BYTES:
+                break
+        tail.reverse()
+        return ''.join(tail)[-self._TAIL_BYTES:]
+
 class DroidRunRunner:
     """
     Safe wrapper for DroidRun agent execution.
     Handles both Coroutines and WorkflowHandlers with proper cleanup.
     """
     
-    def __init__(self, llm, config_fast, config_full):
+    def __init__(self, llm, config_fast, config_full, serialize: bool = True):
+        """
+        serialize=True (default) runs agents one at a time - required
+        when callers share a single device. Pass False to skip the
+        per-call lock round-trip when calls are already sequential or
+        each runner owns its own device.
+        """
         self.llm = llm
         self.config_fast = config_fast
         self.config_full = config_full
+        self.serialize = serialize
         self._lock = asyncio.Lock()
-    
+
     async def run(
         self,
         goal: str,
@@ -33,81 +135,99 @@ class DroidRunRunner:
         Supports both old (coroutine) and new (WorkflowHandler) return types.
         """
         cfg = self.config_fast if fast else self.config_full
-        
-        async with self._lock:
+
+        lock_ctx = self._lock if self.serialize else contextlib.nullcontext()
+        async with lock_ctx:
+            # A fresh agent per run, deliberately: DroidAgent.run()
+            # hands out a one-shot workflow, and an instance whose run
+            # was cancelled (timeout/error paths below) is not safe to
+            # re-run - caching would let one timeout poison every later
+            # use of a recurring goal like the Home-button reset
             agent = DroidAgent(goal=goal, config=cfg, llms=self.llm)
+
+            # Setup stdout capture - per-call redirect_stdout keeps each
+            # buffer scoped to this run instead of mutating global sys.stdout
+            buf = SentinelCapture() if capture_stdout else None
+            capture_ctx = (
+                contextlib.redirect_stdout(buf)
+                if capture_stdout
+                else contextlib.nullcontext()
+            )
+
+            with capture_ctx:
+                return await self._run_agent(agent, timeout_s, buf)
+
+    @staticmethod
+    def _collect(buf) -> Optional[str]:
+        """Prefer the streamed sentinel region over the full log"""
+        if not buf:
+            return None
+        buf.flush_pending()
+        return buf.result_text or buf.getvalue()
+
+    async def _run_agent(self, agent, timeout_s, buf):
+        """Execute the agent and normalize its (output, error) result"""
+        # Bind the asyncio names used on every await as locals - LOAD_FAST
+        # instead of module-dict lookups in the hot run/timeout paths
+        _wait_for = asyncio.wait_for
+        _shield = asyncio.shield
+        _TimeoutError = asyncio.TimeoutError
+
+        # Get the process (could be coroutine or WorkflowHandler)
+        process = agent.run()
+
+        # Determine type and create proper task
+        if asyncio.iscoroutine(process):
+            # Legacy: coroutine - wrap in task
+            task = asyncio.create_task(process)
+            cancel = task.cancel
+        else:
+            # Modern: WorkflowHandler - use directly
+            task = process
+            # Resolve the cancel method once instead of hasattr-probing
+            # (an MRO walk) on every timeout/error path
+            cancel = getattr(task, 'cancel_run', None) or getattr(task, 'cancel', None)
+
+        try:
+            # Wait with timeout (works for both types)
+            await _wait_for(task, timeout=timeout_s)
+            out = self._collect(buf)
+            return out, None
             
-            # Setup stdout capture
-            old_stdout = sys.stdout
-            buf = io.StringIO() if capture_stdout else None
-            if capture_stdout:
-                sys.stdout = buf
+        except _TimeoutError as e:
+            print(f"⚠️ Task timed out after {timeout_s}s - cancelling safely...")
             
-            # Get the process (could be coroutine or WorkflowHandler)
-            process = agent.run()
+            if cancel:
+                try:
+                    cancel()
+                except:
+                    pass
+
+            # Wait on the task itself rather than sleeping a fixed
+            # 200ms - returns the moment cancellation settles
+            try:
+                await _wait_for(_shield(task), timeout=1.2)
+            except:
+                pass  # Already cancelled or finished
             
-            # Determine type and create proper task
-            if asyncio.iscoroutine(process):
-                # Legacy: coroutine - wrap in task
-                task = asyncio.create_task(process)
-                is_workflow = False
-            else:
-                # Modern: WorkflowHandler - use directly
-                task = process
-                is_workflow = True
+            out = self._collect(buf)
+            return out, e
             
-            try:
-                # Wait with timeout (works for both types)
-                await asyncio.wait_for(task, timeout=timeout_s)
-                out = buf.getvalue() if buf else None
-                return out, None
-                
-            except asyncio.TimeoutError as e:
-                print(f"⚠️ Task timed out after {timeout_s}s - cancelling safely...")
-                
-                # Cancel based on type
-                if is_workflow and hasattr(task, 'cancel_run'):
-                    try:
-                        task.cancel_run()
-                    except:
-                        pass
-                elif hasattr(task, 'cancel'):
-                    task.cancel()
-                
-                # CRITICAL: Give it time to cleanup
-                await asyncio.sleep(0.2)
-                
-                # Try to await cancellation
+        except Exception as e:
+            print(f"⚠️ Agent error: {type(e).__name__}: {e}")
+            
+            # Cancel on any error
+            if cancel:
                 try:
-                    await asyncio.wait_for(asyncio.shield(task), timeout=1.0)
+                    cancel()
                 except:
-                    pass  # Already cancelled or finished
-                
-                out = buf.getvalue() if buf else None
-                return out, e
-                
-            except Exception as e:
-                print(f"⚠️ Agent error: {type(e).__name__}: {e}")
-                
-                # Cancel on any error
-                if is_workflow and hasattr(task, 'cancel_run'):
-                    try:
-                        task.cancel_run()
-                    except:
-                        pass
-                elif hasattr(task, 'cancel'):
-                    try:
-                        task.cancel()
-                    except:
-                        pass
-                
-                # Cleanup delay
-                await asyncio.sleep(0.2)
-                
-                out = buf.getvalue() if buf else None
-                return out, e
-                
-            finally:
-                # Always restore stdout
-                if capture_stdout:
-                    sys.stdout = old_stdout
\ No newline at end of file
+                    pass
+
+            # Grace period that exits as soon as the task settles
+            try:
+                await _wait_for(_shield(task), timeout=0.2)
+            except:
+                pass
+
+            out = self._collect(buf)
+            return out, e
@@ -4,6 +4,9 @@ Smart Grocery Price Bot - Production Version
 All fixes applied: Zombie tasks, Ghost clicks, List/Dict handling, Timeouts
 """
 import asyncio
+import logging
+import time
+from functools import lru_cache
 from llama_index.llms.google_genai import GoogleGenAI
 
 from config import config
@@ -12,14 +15,70 @@ from ai_analyzer import AIAnalyzer
 from app_navigator import AppNavigator
 from price_checker import PriceChecker
 
+# Hot-path modules log via logging instead of print; keep their status
+# lines visible on the console without per-call stdout flushes
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+# Decorative banners built once at import; _dlog drops them entirely on
+# quiet runs (debug_mode=False) instead of building + flushing strings
+_SEP = "=" * 70
+_BOT_BAR = "🤖" * 35
+_ROCKET_BAR = "🚀" * 35
+_PHASE_BARS = {
+    1: "🔵" * 35,
+    2: "🟡" * 35,
+    3: "🔴" * 35,
+    4: "🟢" * 35,
+    5: "🟣" * 35,
+}
+_dlog = print if config.debug_mode else (lambda *args, **kwargs: None)
+
+@lru_cache(maxsize=1)
+def _get_llm(model: str, api_key: str, temperature: float) -> GoogleGenAI:
+    """
+    Share the DroidRun LLM across SmartGroceryBot instances - the
+    client owns HTTP sessions worth reusing on reconstruction
+    (tests, retries, CLI loops).
+    """
+    return GoogleGenAI(model=model, api_key=api_key, temperature=temperature)
+
+# Message templates built once at import - run() only fills in the
+# product/platform placeholders
+_GREETING = (
+    "👋 Hi! I'm your Smart Grocery Bot.\n\n"
+    "I can help you compare prices on Blinkit and Zepto!\n\n"
+    "Try asking:\n"
+    "• 'Check tomato prices'\n"
+    "• 'Find milk prices'\n"
+    "• 'Compare onion prices'\n\n"
+    "What would you like to search? 🛒"
+)
+
+_ACK_TEMPLATE = (
+    "🔍 Searching for *{product}* on {platforms}...\n\n"
+    "⏳ This will take 30-60 seconds. Please wait!"
+)
+
+_NOT_FOUND_TEMPLATE = (
+    "😔 Sorry, I couldn't find prices for *{product}*.\n\n"
+    "Possible reasons:\n"
+    "• Product not available on these platforms\n"
+    "• App loading issues\n"
+    "• Product name too generic\n\n"
+    "Try:\n"
+    "• Being more specific (e.g., 'red onions' instead of 'onions')\n"
+    "• Checking the apps manually\n"
+    "• Trying a different product"
+)
+
 class SmartGroceryBot:
     def __init__(self):
         """Initialize the complete grocery bot system"""
-        print("\n" + "🤖" * 35)
-        print("SMART GROCERY PRICE BOT - PRODUCTION v2.0")
-        print("🤖" * 35)
-        print("\n🛒 Platforms: Blinkit & Zepto")
-        print("🔧 Fixes: Anti-Zombie, Anti-Ghost, List/Dict Handling\n")
+        _dlog("\n" + _BOT_BAR)
+        _dlog("SMART GROCERY PRICE BOT - PRODUCTION v2.0")
+        _dlog(_BOT_BAR)
+        _dlog("\n🛒 Platforms: Blinkit & Zepto")
+        _dlog("🔧 Fixes: Anti-Zombie, Anti-Ghost, List/Dict Handling\n")
         
         # Validate configuration
         config.validate()
@@ -27,11 +86,7 @@ class SmartGroceryBot:
         
         # Initialize LLM for DroidRun
         print("🧠 Initializing Gemini LLM...")
-        self.llm = GoogleGenAI(
-            model=config.gemini_droidrun_model,
-            api_key=config.gemini_api_key,
-            temperature=0.0
-        )
+        self.llm = _get_llm(config.gemini_droidrun_model, config.gemini_api_key, 0.0)
         print(f"✅ LLM initialized: {config.gemini_droidrun_model}\n")
         
         # Initialize all modules
@@ -48,19 +103,21 @@ class SmartGroceryBot:
         if not chat_name:
             chat_name = config.chat_name
         
-        print("\n" + "="*70)
-        print("🚀 STARTING BOT WORKFLOW")
-        print("="*70)
-        print(f"📱 Target Chat: {chat_name}")
-        print(f"⏰ Started at: {asyncio.get_event_loop().time():.2f}s")
-        print("="*70 + "\n")
+        _dlog("\n" + _SEP)
+        _dlog("🚀 STARTING BOT WORKFLOW")
+        _dlog(_SEP)
+        _dlog(f"📱 Target Chat: {chat_name}")
+        _dlog(_SEP + "\n")
+
+        # Cheap vDSO read - no event-loop accessor needed for wall time
+        started = time.monotonic()
         
         # ========================================
         # PHASE 1: READ MESSAGE FROM WHATSAPP
         # ========================================
-        print("🔵" * 35)
-        print("PHASE 1: READING WHATSAPP MESSAGE")
-        print("🔵" * 35)
+        _dlog(_PHASE_BARS[1])
+        _dlog("PHASE 1: READING WHATSAPP MESSAGE")
+        _dlog(_PHASE_BARS[1])
         
         message = await self.whatsapp.read_last_message(chat_name)
         
@@ -77,25 +134,16 @@ class SmartGroceryBot:
         # ========================================
         # PHASE 2: ANALYZE MESSAGE
         # ========================================
-        print("\n🟡" * 35)
-        print("PHASE 2: AI ANALYSIS")
-        print("🟡" * 35)
+        _dlog("\n" + _PHASE_BARS[2])
+        _dlog("PHASE 2: AI ANALYSIS")
+        _dlog(_PHASE_BARS[2])
         
-        product_info = self.ai_analyzer.extract_product_info(message)
+        product_info = await self.ai_analyzer.extract_product_info(message)
         
         # Check if it's a product query
         if not product_info.get('is_product'):
             print("\n⚠️ NOT A PRODUCT QUERY")
-            response = (
-                "👋 Hi! I'm your Smart Grocery Bot.\n\n"
-                "I can help you compare prices on Blinkit and Zepto!\n\n"
-                "Try asking:\n"
-                "• 'Check tomato prices'\n"
-                "• 'Find milk prices'\n"
-                "• 'Compare onion prices'\n\n"
-                "What would you like to search? 🛒"
-            )
-            await self.whatsapp.send_message(chat_name, response)
+            await self.whatsapp.send_message(chat_name, _GREETING)
             await self.whatsapp.go_home()
             return
         
@@ -107,14 +155,14 @@ class SmartGroceryBot:
         print(f"📊 Category: {category}")
         print(f"⚖️ Quantity: {quantity}")
         
-        # Determine platforms
-        platforms = self.ai_analyzer.determine_platforms(category, product_name)
+        # Platforms are a fixed constant - no call/print overhead
+        platforms = self.ai_analyzer.PLATFORMS
         print(f"✅ Platforms: {', '.join(platforms)}")
         
         # Send acknowledgment
-        ack_message = (
-            f"🔍 Searching for *{product_name}* on {' & '.join(platforms)}...\n\n"
-            f"⏳ This will take 30-60 seconds. Please wait!"
+        ack_message = _ACK_TEMPLATE.format(
+            product=product_name,
+            platforms=' & '.join(platforms)
         )
         await self.whatsapp.send_message(chat_name, ack_message)
         await asyncio.sleep(1)
@@ -122,9 +170,9 @@ class SmartGroceryBot:
         # ========================================
         # PHASE 3: CHECK PRICES ON APPS
         # ========================================
-        print("\n🔴" * 35)
-        print("PHASE 3: MULTI-PLATFORM PRICE CHECK")
-        print("🔴" * 35)
+        _dlog("\n" + _PHASE_BARS[3])
+        _dlog("PHASE 3: MULTI-PLATFORM PRICE CHECK")
+        _dlog(_PHASE_BARS[3])
         
         price_data = await self.price_checker.check_multiple_platforms(
             platforms=platforms,
@@ -132,23 +180,19 @@ class SmartGroceryBot:
             delay=config.rate_limit_delay
         )
         
-        # Check if we got any valid prices
-        valid_prices = [p for p in price_data if p.get('price') and p.get('status') == 'found']
+        # Check if we got any valid prices - one pass, each key read once
+        valid_prices = []
+        for p in price_data:
+            price = p.get('price')
+            if price and p.get('status') == 'found':
+                valid_prices.append(p)
         
         if not valid_prices:
             print("\n❌ No valid prices found")
-            error_message = (
-                f"😔 Sorry, I couldn't find prices for *{product_name}*.\n\n"
-                f"Possible reasons:\n"
-                f"• Product not available on these platforms\n"
-                f"• App loading issues\n"
-                f"• Product name too generic\n\n"
-                f"Try:\n"
-                f"• Being more specific (e.g., 'red onions' instead of 'onions')\n"
-                f"• Checking the apps manually\n"
-                f"• Trying a different product"
+            await self.whatsapp.send_message(
+                chat_name,
+                _NOT_FOUND_TEMPLATE.format(product=product_name)
             )
-            await self.whatsapp.send_message(chat_name, error_message)
             await self.whatsapp.go_home()
             return
         
@@ -157,18 +201,18 @@ class SmartGroceryBot:
         # ========================================
         # PHASE 4: GENERATE RECOMMENDATION
         # ========================================
-        print("\n🟢" * 35)
-        print("PHASE 4: AI RECOMMENDATION")
-        print("🟢" * 35)
+        _dlog("\n" + _PHASE_BARS[4])
+        _dlog("PHASE 4: AI RECOMMENDATION")
+        _dlog(_PHASE_BARS[4])
         
-        recommendation = self.ai_analyzer.generate_recommendation(product_info, valid_prices)
+        recommendation = await self.ai_analyzer.generate_recommendation(product_info, valid_prices)
         
         # ========================================
         # PHASE 5: SEND RESULTS
         # ========================================
-        print("\n🟣" * 35)
-        print("PHASE 5: SENDING RESULTS")
-        print("🟣" * 35)
+        _dlog("\n" + _PHASE_BARS[5])
+        _dlog("PHASE 5: SENDING RESULTS")
+        _dlog(_PHASE_BARS[5])
         
         # Format complete message
         final_message = self.price_checker.format_price_summary(price_data)
@@ -188,10 +232,10 @@ class SmartGroceryBot:
         # ========================================
         # COMPLETION
         # ========================================
-        print("\n" + "="*70)
+        _dlog("\n" + _SEP)
         print("✅ BOT WORKFLOW COMPLETED SUCCESSFULLY!")
-        print(f"⏰ Completed at: {asyncio.get_event_loop().time():.2f}s")
-        print("="*70)
+        print(f"⏰ Elapsed: {time.monotonic() - started:.2f}s")
+        _dlog(_SEP)
     
     async def send_error_message(self, chat_name: str, error_text: str):
         """Send error message to user"""
@@ -204,9 +248,9 @@ class SmartGroceryBot:
 async def main():
     """Main entry point"""
     try:
-        print("\n" + "🚀" * 35)
-        print("STARTING SMART GROCERY BOT")
-        print("🚀" * 35 + "\n")
+        _dlog("\n" + _ROCKET_BAR)
+        _dlog("STARTING SMART GROCERY BOT")
+        _dlog(_ROCKET_BAR + "\n")
         
         bot = SmartGroceryBot()
         await bot.run()
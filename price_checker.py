@@ -4,35 +4,176 @@ Price Checker Module - v2.3 FIXED
 Adds: Per-kg price normalization for fair comparison
 """
 import asyncio
+import functools
+import json
+import logging
+import os
+import random
 import re
-from typing import List, Dict, Optional
+import time
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional
+
+# Cross-restart cache file - an agent run is expensive enough that
+# reusing a minutes-old result across CLI invocations is a clear win
+_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_cache.json")
+
+logger = logging.getLogger(__name__)
+
+# Shared rendering constants - built once instead of per call
+_SEP60 = "=" * 60
+_SEP30 = "=" * 30
+_MEDALS = ("🥇", "🥈", "🥉")
+
+# Compiled once - _clean_price runs on every price field per platform
+# and again inside the sort keys in format_price_summary
+# C-level per-char delete of currency symbols/commas/whitespace -
+# faster than a regex char class on the short strings prices are
+_STRIP_TABLE = str.maketrans('', '', '₹Rs,$€£ \t\n\r')
+_NONNUM_RE = re.compile(r'[^\d.]')
+
+# Unit-to-kg factors - one dict probe instead of an if/elif ladder
+# (litres treated as kg, matching the previous behavior)
+_UNIT_TO_KG = {'kg': 1.0, 'l': 1.0, 'g': 1e-3, 'gm': 1e-3, 'ml': 1e-3}
+
+@functools.lru_cache(maxsize=1024)
+def _parse_weight_kg(weight: str) -> Optional[float]:
+    """
+    Parse "300g" / "1.5 kg" / "500ml" to kilograms. Hand-written scan
+    instead of a regex: the grammar is just digits, an optional dot,
+    optional spaces and a short unit, and a direct walk avoids the
+    regex engine and Match allocation on every item. Weight strings
+    come from a tiny vocabulary ("1kg", "500g", ...), so the LRU cache
+    turns repeat parses into a dict hit.
+    """
+    w = weight.lower()
+    n = len(w)
+    i = 0
+    while i < n:
+        # Find the next digit run
+        while i < n and not w[i].isdigit():
+            i += 1
+        if i == n:
+            return None
+        start = i
+        seen_dot = False
+        while i < n and (w[i].isdigit() or (w[i] == '.' and not seen_dot)):
+            if w[i] == '.':
+                seen_dot = True
+            i += 1
+        num_text = w[start:i]
+        while i < n and w[i] == ' ':
+            i += 1
+        # Two-letter units (kg/gm/ml) first, then single-letter (g/l)
+        factor = _UNIT_TO_KG.get(w[i:i + 2]) or _UNIT_TO_KG.get(w[i:i + 1])
+        if factor is not None:
+            try:
+                return float(num_text) * factor
+            except ValueError:
+                return None
+        # No unit after this number ("pack of 2, 500g") - keep scanning
+    return None
+
+class _Aggregate(NamedTuple):
+    """Single-pass price statistics shared by the summary helpers"""
+    n: int
+    total: float
+    price_min: float
+    price_max: float
+    best_item: Optional[Dict]
+    per_kg_n: int
+    per_kg_sum: float
+    per_kg_min: float
+    per_kg_max: float
 
 class PriceChecker:
+    # Successful lookups stay fresh this long; errors/not-found get a
+    # short TTL so a transiently broken platform isn't locked out
+    _CACHE_TTL_FOUND = 300
+    _CACHE_TTL_MISS = 30
+
     def __init__(self, app_navigator, ai_analyzer):
         """Initialize Price Checker with navigator and analyzer"""
         self.navigator = app_navigator
         self.analyzer = ai_analyzer
-    
+        # Caps concurrent platform checks so the gather fan-out can't
+        # overwhelm the ADB bridge or Gemini rate limits
+        self._sem = asyncio.Semaphore(int(os.environ.get("SMARTGROCER_CONCURRENCY", "4")))
+        # "platform|normalized product" -> [expiry_epoch, result dict].
+        # A cache hit skips the whole agent pipeline - the single most
+        # expensive step in the stack - for repeat queries. Backed by a
+        # JSON file so fresh entries also survive process restarts;
+        # expiries are wall-clock epochs for that reason.
+        self._cache: Dict[str, list] = self._load_cache()
+
+    @staticmethod
+    def _load_cache() -> Dict[str, list]:
+        """Read the persisted cache, dropping already-expired entries"""
+        try:
+            with open(_CACHE_FILE, encoding="utf-8") as f:
+                stored = json.load(f)
+            now = time.time()
+            return {k: v for k, v in stored.items() if v[0] > now}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        """Best-effort write-through; a failed write never breaks a check"""
+        try:
+            with open(_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(self._cache, f)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _cache_key(platform: str, product_name: str) -> str:
+        return f"{platform.lower()}|{product_name.strip().lower()}"
+
+    def _cached_result(self, key: str) -> Optional[Dict]:
+        """Fresh cached result for a key, evicting it if expired"""
+        cached = self._cache.get(key)
+        if cached is not None:
+            expiry, result = cached
+            if time.time() < expiry:
+                return result
+            del self._cache[key]
+        return None
+
+    def invalidate(self, platform: str, product_name: str):
+        """Drop a cached lookup (e.g. after a known price change)"""
+        if self._cache.pop(self._cache_key(platform, product_name), None) is not None:
+            self._save_cache()
+
     async def check_single_platform(self, platform: str, product_name: str) -> Dict:
-        """Check price on a single platform"""
-        print(f"\n📊 Checking {platform}...")
+        """Check price on a single platform (cached per product + TTL)"""
+        key = self._cache_key(platform, product_name)
+        cached = self._cached_result(key)
+        if cached is not None:
+            logger.info("\n📊 %s: using cached result", platform)
+            return cached
+
+        logger.info("\n📊 Checking %s...", platform)
         
         try:
-            price_data = await self.navigator.get_price_via_single_agent(platform, product_name)
+            price_data = await self._with_retry(
+                lambda: self.navigator.get_price_via_single_agent(platform, product_name)
+            )
             
             if not price_data:
-                print(f"⚠️ No data from {platform}")
+                logger.warning("⚠️ No data from %s", platform)
                 return {
                     "platform": platform,
                     "status": "error",
                     "note": "No data returned"
                 }
             
-            # Clean price data
+            # Parse price fields to floats once at the boundary - all
+            # downstream sorting/stats work on numbers, display
+            # formatting happens only in format_price_summary
             if price_data.get('price'):
-                price_data['price'] = self._clean_price(price_data['price'])
+                price_data['price'] = self._parse_price(price_data['price'])
             if price_data.get('original_price'):
-                price_data['original_price'] = self._clean_price(price_data['original_price'])
+                price_data['original_price'] = self._parse_price(price_data['original_price'])
             
             # CRITICAL: Calculate per-kg price for fair comparison
             if price_data.get('price') and price_data.get('weight'):
@@ -42,38 +183,54 @@ class PriceChecker:
                 )
             
             if price_data.get('status') == 'found' and price_data.get('price'):
-                weight_info = f" ({price_data.get('weight', 'unknown')})" if price_data.get('weight') else ""
-                per_kg_info = f" [₹{price_data.get('price_per_kg', 'N/A')}/kg]" if price_data.get('price_per_kg') else ""
-                print(f"✅ {platform}: ₹{price_data['price']}{weight_info}{per_kg_info}")
-                return price_data
+                # Build the status line only if INFO is actually emitted
+                if logger.isEnabledFor(logging.INFO):
+                    weight_info = f" ({price_data.get('weight', 'unknown')})" if price_data.get('weight') else ""
+                    per_kg_info = f" [₹{price_data.get('price_per_kg', 'N/A')}/kg]" if price_data.get('price_per_kg') else ""
+                    logger.info("✅ %s: ₹%g%s%s", platform, price_data['price'], weight_info, per_kg_info)
+                ttl = self._CACHE_TTL_FOUND
             else:
-                print(f"⚠️ {platform}: {price_data.get('note', 'No price found')}")
-                return price_data
+                logger.warning("⚠️ %s: %s", platform, price_data.get('note', 'No price found'))
+                ttl = self._CACHE_TTL_MISS
+            self._cache[key] = [time.time() + ttl, price_data]
+            self._save_cache()
+            return price_data
                 
         except Exception as e:
-            print(f"❌ Error checking {platform}: {e}")
+            logger.error("❌ Error checking %s: %s", platform, e)
             return {
                 "platform": platform,
                 "status": "error",
                 "note": str(e)[:100]
             }
     
-    def _clean_price(self, price_str) -> str:
-        """Clean price string by removing currency symbols"""
+    def _parse_price(self, price_str) -> Optional[float]:
+        """Parse a price (string with currency symbols, or number) to float"""
         if not price_str:
             return None
-        
-        price_str = str(price_str)
-        cleaned = re.sub(r'[₹Rs,\s$€£]', '', price_str)
-        cleaned = re.sub(r'[^\d.]', '', cleaned)
-        
+
+        # Fast paths: numbers (e.g. re-cached results) and plain digit
+        # strings need no regex pass at all
+        if isinstance(price_str, (int, float)):
+            return float(price_str)
+        price_str = price_str if isinstance(price_str, str) else str(price_str)
+        if price_str.isdigit():
+            return float(price_str)
+
+        cleaned = price_str.translate(_STRIP_TABLE)
+
         try:
-            float(cleaned)
-            return cleaned
+            return float(cleaned)
         except ValueError:
-            return None
+            # Stray characters beyond currency symbols - regex sweep
+            cleaned = _NONNUM_RE.sub('', cleaned)
+            try:
+                return float(cleaned)
+            except ValueError:
+                return None
     
-    def _calculate_price_per_kg(self, price: str, weight: str) -> Optional[float]:
+    @staticmethod
+    def _calculate_price_per_kg(price: float, weight: str) -> Optional[float]:
         """
         Calculate price per kilogram for fair comparison.
         
@@ -83,25 +240,11 @@ class PriceChecker:
         - price=31, weight="1kg" → 31.00 per kg
         """
         try:
-            price_val = float(price)
-            
-            # Extract numeric weight and unit
-            weight_match = re.search(r'(\d+(?:\.\d+)?)\s*(kg|g|l|ml|gm)', weight.lower())
-            if not weight_match:
-                return None
-            
-            weight_num = float(weight_match.group(1))
-            unit = weight_match.group(2)
+            price_val = float(price)  # tolerates legacy string input
             
-            # Convert to kg
-            if unit in ['kg', 'l']:
-                weight_kg = weight_num
-            elif unit in ['g', 'gm', 'ml']:
-                weight_kg = weight_num / 1000.0
-            else:
-                return None
+            weight_kg = _parse_weight_kg(weight)
             
-            if weight_kg <= 0:
+            if not weight_kg or weight_kg <= 0:
                 return None
             
             # Calculate per-kg price
@@ -111,142 +254,233 @@ class PriceChecker:
         except (ValueError, ZeroDivisionError):
             return None
     
+    @staticmethod
+    async def _with_retry(coro_fn, *, tries: int = 3, base: float = 1.0):
+        """
+        Retry a transient agent failure with jittered exponential
+        backoff. Results (including not_found) are never retried - only
+        raised exceptions count as transient.
+        """
+        for attempt in range(tries):
+            try:
+                return await coro_fn()
+            except Exception as e:
+                if attempt == tries - 1:
+                    raise
+                delay = base * 2 ** attempt + random.random() * 0.1
+                logger.warning(
+                    "⚠️ Attempt %d failed (%s) - retrying in %.1fs",
+                    attempt + 1, e, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def _check_and_close(self, platform: str, product_name: str) -> Dict:
+        """Check one platform (under the concurrency cap), then close its app"""
+        # A cache hit never opened the app, so there is nothing to
+        # close - skip the ADB force-stop + go-home agent run entirely
+        cached = self._cached_result(self._cache_key(platform, product_name))
+        if cached is not None:
+            logger.info("\n📊 %s: using cached result", platform)
+            return cached
+
+        async with self._sem:
+            try:
+                return await self.check_single_platform(platform, product_name)
+            finally:
+                await self.navigator.close_app(platform)
+
     async def check_multiple_platforms(
-        self, 
-        platforms: List[str], 
+        self,
+        platforms: List[str],
         product_name: str,
         delay: int = 3
     ) -> List[Dict]:
-        """Check prices across multiple platforms sequentially"""
-        print(f"\n{'='*60}")
-        print(f"🛒 GROCERY PRICE COMPARISON")
-        print(f"📦 Product: {product_name}")
-        print(f"🏪 Platforms: {', '.join(platforms)}")
-        print(f"{'='*60}\n")
-        
+        """
+        Check prices across multiple platforms concurrently.
+        Total wall time is roughly the slowest platform instead of the
+        sum of all of them; the navigator's runner lock still serializes
+        UI steps on a shared device. `delay` is kept for callers but no
+        longer used - there is no inter-platform gap to pace.
+        """
+        logger.info(
+            "\n%s\n🛒 GROCERY PRICE COMPARISON\n📦 Product: %s\n🏪 Platforms: %s\n%s\n",
+            _SEP60, product_name, ', '.join(platforms), _SEP60
+        )
+
+        results = await asyncio.gather(
+            *(self._check_and_close(p, product_name) for p in platforms),
+            return_exceptions=True
+        )
+
         all_prices = []
-        
-        for platform in platforms:
-            price_data = await self.check_single_platform(platform, product_name)
-            
+        for platform, price_data in zip(platforms, results):
+            if isinstance(price_data, Exception):
+                logger.error("❌ %s task failed: %s", platform, price_data)
+                continue
             if price_data and price_data.get('price'):
                 all_prices.append(price_data)
-            
-            await self.navigator.close_app(platform)
-            
-            if delay > 0 and platform != platforms[-1]:
-                print(f"⏳ Waiting {delay}s before next platform...")
-                await asyncio.sleep(delay)
-        
+
         return all_prices
     
     def find_best_deal(self, price_data: List[Dict]) -> Dict:
         """Find the best deal using per-kg price when available"""
         if not price_data:
             return None
-        
-        valid_prices = [p for p in price_data if p.get('price')]
-        
-        if not valid_prices:
-            return None
-        
-        # Sort by per-kg price if available, otherwise by absolute price
-        best_deal = min(
-            valid_prices,
-            key=lambda x: x.get('price_per_kg') or self._extract_numeric_price(x)
+        if len(price_data) == 1:
+            # Single result - it's the best deal iff it has a price
+            item = price_data[0]
+            return item if item.get('price') else None
+        return self._aggregate(price_data).best_item
+
+    def _aggregate(self, price_data: List[Dict]) -> "_Aggregate":
+        """
+        One traversal computing count/sum/min/max over absolute and
+        per-kg prices plus the best-deal item, so find_best_deal,
+        calculate_savings and get_summary_stats don't each rescan the
+        list (and re-derive keys) independently.
+        """
+        inf = float('inf')
+        n = 0
+        total = 0.0
+        price_min = inf
+        price_max = -inf
+        best_item = None
+        best_key = inf
+        per_kg_n = 0
+        per_kg_sum = 0.0
+        per_kg_min = inf
+        per_kg_max = -inf
+
+        for p in price_data:
+            per_kg = p.get('price_per_kg')
+            if per_kg:
+                per_kg_n += 1
+                per_kg_sum += per_kg
+                if per_kg < per_kg_min:
+                    per_kg_min = per_kg
+                if per_kg > per_kg_max:
+                    per_kg_max = per_kg
+            if p.get('price'):
+                value = self._numeric_price(p)
+                n += 1
+                total += value
+                if value < price_min:
+                    price_min = value
+                if value > price_max:
+                    price_max = value
+                # Best deal ranks by per-kg price, absolute as fallback
+                key = per_kg or value
+                if key < best_key:
+                    best_key = key
+                    best_item = p
+
+        return _Aggregate(
+            n, total, price_min, price_max, best_item,
+            per_kg_n, per_kg_sum, per_kg_min, per_kg_max,
         )
-        
-        return best_deal
     
-    def _extract_numeric_price(self, item: Dict) -> float:
-        """Extract numeric price from item"""
-        price_str = str(item.get('price', '999999'))
-        cleaned = self._clean_price(price_str)
-        
-        try:
-            return float(cleaned) if cleaned else 999999.0
-        except (ValueError, TypeError):
-            return 999999.0
+    def _numeric_price(self, item: Dict) -> float:
+        """
+        Numeric price of an item. Prices are stored as floats since
+        chunk2-12, so this is normally a plain dict read; the parse
+        branch only fires for legacy string entries (old cache files,
+        hand-built dicts).
+        """
+        price = item.get('price')
+        if isinstance(price, (int, float)):
+            return float(price)
+        value = self._parse_price(price)
+        return value if value is not None else 999999.0
     
     def calculate_savings(self, price_data: List[Dict]) -> Dict:
         """
         Calculate savings using per-kg prices for fair comparison
         """
-        if len(price_data) < 2:
+        return self._savings_from(self._aggregate(price_data), len(price_data))
+
+    @staticmethod
+    def _savings_from(agg: "_Aggregate", n_items: int) -> Dict:
+        """Derive the savings dict from already-computed aggregates"""
+        if n_items < 2:
             return {"max_savings": 0, "percentage": 0, "comparison_basis": "none"}
         
-        # Try to use per-kg prices first
-        per_kg_prices = [
-            p.get('price_per_kg') 
-            for p in price_data 
-            if p.get('price_per_kg')
-        ]
-        
-        if len(per_kg_prices) >= 2:
-            # Compare using per-kg
-            min_price = min(per_kg_prices)
-            max_price = max(per_kg_prices)
-            savings = max_price - min_price
-            percentage = (savings / max_price * 100) if max_price > 0 else 0
+        if agg.per_kg_n >= 2:
+            # Compare using per-kg; identical prices (common for
+            # small-vocabulary staples) skip the percentage math
+            if agg.per_kg_max == agg.per_kg_min:
+                return {
+                    "max_savings_per_kg": 0,
+                    "percentage": 0,
+                    "min_price_per_kg": agg.per_kg_min,
+                    "max_price_per_kg": agg.per_kg_max,
+                    "comparison_basis": "per_kg"
+                }
+            savings = agg.per_kg_max - agg.per_kg_min
+            percentage = (savings / agg.per_kg_max * 100) if agg.per_kg_max > 0 else 0
             
             return {
                 "max_savings_per_kg": round(savings, 2),
                 "percentage": round(percentage, 1),
-                "min_price_per_kg": min_price,
-                "max_price_per_kg": max_price,
+                "min_price_per_kg": agg.per_kg_min,
+                "max_price_per_kg": agg.per_kg_max,
                 "comparison_basis": "per_kg"
             }
         else:
             # Fallback to absolute price comparison
-            valid_prices = [
-                self._extract_numeric_price(p)
-                for p in price_data if p.get('price')
-            ]
-            
-            if not valid_prices:
+            if not agg.n:
                 return {"max_savings": 0, "percentage": 0, "comparison_basis": "none"}
             
-            min_price = min(valid_prices)
-            max_price = max(valid_prices)
-            savings = max_price - min_price
-            percentage = (savings / max_price * 100) if max_price > 0 else 0
+            savings = agg.price_max - agg.price_min
+            percentage = (savings / agg.price_max * 100) if agg.price_max > 0 else 0
             
             return {
                 "max_savings": round(savings, 2),
                 "percentage": round(percentage, 1),
-                "min_price": min_price,
-                "max_price": max_price,
+                "min_price": agg.price_min,
+                "max_price": agg.price_max,
                 "comparison_basis": "absolute"
             }
     
+    def _prepare_summary(self, price_data: List[Dict]) -> tuple:
+        """
+        One aggregation pass feeding the summary: returns
+        (sorted results, has_per_kg flag, savings dict) so
+        format_price_summary is a pure rendering loop with no rescans.
+        """
+        agg = self._aggregate(price_data)
+        has_per_kg = agg.per_kg_n > 0
+        
+        # Decorate-sort-undecorate: compute each sort key once up front
+        # instead of re-deriving it inside the comparison callback
+        if has_per_kg:
+            decorated = [(d.get('price_per_kg') or 999999.0, d) for d in price_data]
+        else:
+            decorated = [(self._numeric_price(d), d) for d in price_data]
+        decorated.sort(key=itemgetter(0))
+        
+        return [d for _, d in decorated], has_per_kg, self._savings_from(agg, len(price_data))
+
     def format_price_summary(self, price_data: List[Dict]) -> str:
         """Format price data with per-kg comparison"""
         if not price_data:
             return "❌ No prices found on any platform."
         
-        # Check if we have per-kg data for fair comparison
-        has_per_kg = any(p.get('price_per_kg') for p in price_data)
+        sorted_data, has_per_kg, savings = self._prepare_summary(price_data)
         
-        message = "🛒 *GROCERY PRICE COMPARISON*\n"
-        message += "=" * 30 + "\n"
+        # Collect fragments and join once - repeated str += re-copies
+        # the whole message on every append
+        parts = ["🛒 *GROCERY PRICE COMPARISON*\n", _SEP30 + "\n"]
         
         if has_per_kg:
-            message += "📊 Comparing by price per kg\n"
+            parts.append("📊 Comparing by price per kg\n")
         
-        message += "\n"
-        
-        # Sort by per-kg price if available, otherwise absolute price
-        if has_per_kg:
-            sorted_data = sorted(
-                price_data,
-                key=lambda x: x.get('price_per_kg') or 999999.0
-            )
-        else:
-            sorted_data = sorted(price_data, key=self._extract_numeric_price)
+        parts.append("\n")
         
         for idx, data in enumerate(sorted_data, 1):
             platform = data.get('platform', 'Unknown')
-            price = data.get('price', 'N/A')
+            price = data.get('price')
+            # Prices are floats internally; render 42.0 as "42" here
+            price = format(price, 'g') if isinstance(price, (int, float)) else (price or 'N/A')
             weight = data.get('weight')
             per_kg = data.get('price_per_kg')
             original = data.get('original_price')
@@ -254,75 +488,62 @@ class PriceChecker:
             stock = data.get('in_stock', 'unknown')
             delivery = data.get('delivery_time', 'Check app')
             
-            medal = "🥇" if idx == 1 else "🥈" if idx == 2 else "🥉"
-            
-            message += f"{medal} *{platform}*\n"
-            message += f"   💰 Price: ₹{price}"
+            medal = _MEDALS[min(idx, 3) - 1]
             
-            if weight:
-                message += f" ({weight})"
-            message += "\n"
+            weight_info = f" ({weight})" if weight else ""
+            parts.append(f"{medal} *{platform}*\n   💰 Price: ₹{price}{weight_info}\n")
             
             # CRITICAL: Show per-kg price for comparison
             if per_kg:
-                message += f"   📊 Per kg: ₹{per_kg}/kg\n"
+                parts.append(f"   📊 Per kg: ₹{per_kg}/kg\n")
             
-            if original and str(original) != str(price):
-                message += f"   🏷️ MRP: ₹{original}\n"
+            if isinstance(original, (int, float)):
+                original = format(original, 'g')
+            if original and str(original) != price:
+                parts.append(f"   🏷️ MRP: ₹{original}\n")
             
             if discount:
-                message += f"   🎉 Discount: {discount}\n"
-            
-            message += f"   🚚 Delivery: {delivery}\n"
+                parts.append(f"   🎉 Discount: {discount}\n")
             
             stock_emoji = "✅" if stock == "yes" else "❌" if stock == "no" else "❓"
-            message += f"   {stock_emoji} Stock: {stock.title()}\n"
-            
-            message += "\n"
-        
-        # Show savings calculation
-        savings = self.calculate_savings(price_data)
+            parts.append(f"   🚚 Delivery: {delivery}\n   {stock_emoji} Stock: {stock.title()}\n\n")
         
+        # Savings were derived from the same aggregation pass above
         if savings.get('comparison_basis') == 'per_kg':
-            message += f"💡 *Save ₹{savings['max_savings_per_kg']}/kg ({savings['percentage']}%)*\n"
-            message += f"   by choosing the cheapest option!\n\n"
+            parts.append(
+                f"💡 *Save ₹{savings['max_savings_per_kg']}/kg ({savings['percentage']}%)*\n"
+                f"   by choosing the cheapest option!\n\n"
+            )
         elif savings.get('max_savings', 0) > 0:
-            message += f"💡 *You can save:* ₹{savings['max_savings']} ({savings['percentage']}%)\n"
-            message += f"   by choosing the cheaper option!\n\n"
+            parts.append(
+                f"💡 *You can save:* ₹{savings['max_savings']} ({savings['percentage']}%)\n"
+                f"   by choosing the cheaper option!\n\n"
+            )
             if not has_per_kg:
-                message += "   ⚠️ Note: Different quantities - compare carefully!\n\n"
+                parts.append("   ⚠️ Note: Different quantities - compare carefully!\n\n")
         
-        message += "=" * 30 + "\n"
+        parts.append(_SEP30 + "\n")
         
-        return message
+        return "".join(parts)
     
     def get_summary_stats(self, price_data: List[Dict]) -> Dict:
         """Get summary statistics"""
         if not price_data:
             return {}
         
-        valid_prices = [
-            self._extract_numeric_price(p)
-            for p in price_data if p.get('price')
-        ]
-        
-        # Include per-kg stats if available
-        per_kg_prices = [
-            p.get('price_per_kg')
-            for p in price_data if p.get('price_per_kg')
-        ]
+        agg = self._aggregate(price_data)
         
         stats = {
             "total_platforms": len(price_data),
-            "avg_price": round(sum(valid_prices) / len(valid_prices), 2) if valid_prices else 0,
-            "min_price": min(valid_prices) if valid_prices else 0,
-            "max_price": max(valid_prices) if valid_prices else 0,
-            "best_platform": self.find_best_deal(price_data)
+            "avg_price": round(agg.total / agg.n, 2) if agg.n else 0,
+            "min_price": agg.price_min if agg.n else 0,
+            "max_price": agg.price_max if agg.n else 0,
+            "best_platform": agg.best_item
         }
         
-        if per_kg_prices:
-            stats["avg_price_per_kg"] = round(sum(per_kg_prices) / len(per_kg_prices), 2)
-            stats["min_price_per_kg"] = min(per_kg_prices)
-            stats["max_price_per_kg"] = max(per_kg_prices)
+        if agg.per_kg_n:
+            stats["avg_price_per_kg"] = round(agg.per_kg_sum / agg.per_kg_n, 2)
+            stats["min_price_per_kg"] = agg.per_kg_min
+            stats["max_price_per_kg"] = agg.per_kg_max
         
         return stats
\ No newline at end of file
@@ -4,10 +4,13 @@ Test Setup for Smart Grocery Bot
 Tests DroidRun connection with Gemini
 """
 import asyncio
+import dataclasses
+import functools
 import os
-from droidrun import DroidAgent
-from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig
-from llama_index.llms.google_genai import GoogleGenAI
+
+# droidrun / llama_index imports are deferred into the helpers below -
+# importing this module stays cheap, and the heavy client imports only
+# load when a test actually runs
 
 # --- CONFIGURATION ---
 GOOGLE_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -16,7 +19,38 @@ if not GOOGLE_KEY:
     print("Please set it in your .env file or paste it below:")
     GOOGLE_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual key for testing
 
-async def test_basic_connection():
+@functools.lru_cache(maxsize=1)
+def _base_config():
+    """One base config; per-test variants only swap the agent section"""
+    from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig
+    return DroidrunConfig(
+        agent=AgentConfig(max_steps=5, reasoning=True),
+        logging=LoggingConfig(debug=True, rich_text=True),
+    )
+
+def _test_config(max_steps: int):
+    """Clone the base config with a different step budget"""
+    from droidrun.config_manager.config_manager import AgentConfig
+    return dataclasses.replace(
+        _base_config(),
+        agent=AgentConfig(max_steps=max_steps, reasoning=True),
+    )
+
+def _make_agent(task: str, config, llm):
+    """Construct a DroidAgent (import deferred to first use)"""
+    from droidrun import DroidAgent
+    return DroidAgent(goal=task, config=config, llms=llm)
+
+def _make_llm():
+    """Build the shared Gemini LLM (model init + HTTP client, once)"""
+    from llama_index.llms.google_genai import GoogleGenAI
+    return GoogleGenAI(
+        model="models/gemini-2.5-pro",
+        api_key=GOOGLE_KEY,
+        temperature=0.0
+    )
+
+async def test_basic_connection(llm):
     """Test 1: Basic DroidRun + Gemini connection"""
     print("\n" + "="*60)
     print("TEST 1: BASIC CONNECTION TEST")
@@ -26,27 +60,13 @@ async def test_basic_connection():
         print("❌ ERROR: Please set your Google API Key!")
         return False
 
-    config = DroidrunConfig(
-        agent=AgentConfig(max_steps=5, reasoning=True),
-        logging=LoggingConfig(debug=True, rich_text=True),
-    )
-
-    try:
-        llm = GoogleGenAI(
-            model="models/gemini-2.5-pro",
-            api_key=GOOGLE_KEY,
-            temperature=0.0
-        )
-        print("✅ Gemini initialized successfully")
-    except Exception as e:
-        print(f"❌ Failed to initialize Gemini: {e}")
-        return False
+    config = _test_config(max_steps=5)
 
     task = 'Open the Calculator app.'
     print(f"\n🚀 Task: {task}")
 
     try:
-        agent = DroidAgent(goal=task, config=config, llms=llm)
+        agent = _make_agent(task, config, llm)
         result = await agent.run()
         print(f"\n✅ TEST PASSED! Result: {result}")
         return True
@@ -54,26 +74,13 @@ async def test_basic_connection():
         print(f"\n❌ TEST FAILED: {e}")
         return False
 
-async def test_whatsapp_open():
+async def test_whatsapp_open(llm):
     """Test 2: Open WhatsApp using DroidRun"""
     print("\n" + "="*60)
     print("TEST 2: WHATSAPP OPENING TEST")
     print("="*60)
 
-    config = DroidrunConfig(
-        agent=AgentConfig(max_steps=8, reasoning=True),
-        logging=LoggingConfig(debug=True, rich_text=True),
-    )
-
-    try:
-        llm = GoogleGenAI(
-            model="models/gemini-2.5-pro",
-            api_key=GOOGLE_KEY,
-            temperature=0.0
-        )
-    except Exception as e:
-        print(f"❌ Failed to initialize Gemini: {e}")
-        return False
+    config = _test_config(max_steps=8)
 
     task = (
         'Open the WhatsApp application. '
@@ -84,7 +91,7 @@ async def test_whatsapp_open():
     print(f"\n🚀 Task: {task}")
 
     try:
-        agent = DroidAgent(goal=task, config=config, llms=llm)
+        agent = _make_agent(task, config, llm)
         result = await agent.run()
         print(f"\n✅ TEST PASSED! WhatsApp opened.")
         print(f"Result: {result}")
@@ -93,26 +100,13 @@ async def test_whatsapp_open():
         print(f"\n❌ TEST FAILED: {e}")
         return False
 
-async def test_grocery_app_open():
+async def test_grocery_app_open(llm):
     """Test 3: Open Blinkit or Zepto"""
     print("\n" + "="*60)
     print("TEST 3: GROCERY APP OPENING TEST")
     print("="*60)
 
-    config = DroidrunConfig(
-        agent=AgentConfig(max_steps=10, reasoning=True),
-        logging=LoggingConfig(debug=True, rich_text=True),
-    )
-
-    try:
-        llm = GoogleGenAI(
-            model="models/gemini-2.5-pro",
-            api_key=GOOGLE_KEY,
-            temperature=0.0
-        )
-    except Exception as e:
-        print(f"❌ Failed to initialize Gemini: {e}")
-        return False
+    config = _test_config(max_steps=10)
 
     # Try Blinkit first, then Zepto if Blinkit fails
     apps_to_test = ["Blinkit", "Zepto"]
@@ -129,7 +123,7 @@ async def test_grocery_app_open():
         )
         
         try:
-            agent = DroidAgent(goal=task, config=config, llms=llm)
+            agent = _make_agent(task, config, llm)
             result = await agent.run()
             print(f"\n✅ {app} TEST PASSED!")
             print(f"Result: {result}")
@@ -149,16 +143,30 @@ async def run_all_tests():
     
     results = {}
     
-    # Test 1: Basic connection
-    results['basic'] = await test_basic_connection()
-    await asyncio.sleep(2)
-    
-    # Test 2: WhatsApp
-    results['whatsapp'] = await test_whatsapp_open()
-    await asyncio.sleep(2)
+    # Shared LLM - model init + HTTP client construction paid once
+    # instead of once per test
+    try:
+        llm = _make_llm()
+        print("✅ Gemini initialized successfully")
+    except Exception as e:
+        print(f"❌ Failed to initialize Gemini: {e}")
+        return
     
-    # Test 3: Grocery apps
-    results['grocery'] = await test_grocery_app_open()
+    # All three tests drive the UI of the same single device, so they
+    # must run in sequence - overlapping them interleaves taps (the
+    # ghost-click hazard app_navigator serializes against with its ADB
+    # lock). The shared LLM above is still built only once. A test that
+    # raises counts as a failure rather than aborting the suite.
+    for name, test in (
+        ('basic', test_basic_connection),
+        ('whatsapp', test_whatsapp_open),
+        ('grocery', test_grocery_app_open),
+    ):
+        try:
+            results[name] = bool(await test(llm))
+        except Exception as e:
+            print(f"❌ {name} test raised: {e}")
+            results[name] = False
     
     # Summary
     print("\n" + "="*60)
@@ -3,10 +3,68 @@
 WhatsApp Handler - Production Version
 Uses DroidRunRunner for safe execution, better message extraction
 """
+import asyncio
+import logging
 import re
+import time
 from droidrun.config_manager.config_manager import DroidrunConfig, AgentConfig, LoggingConfig
 from droid_runner import DroidRunRunner
 
+logger = logging.getLogger(__name__)
+
+# Compiled once - these run on every captured read_last_message output.
+# The open tag is matched group-less (no capture bookkeeping) and the
+# close tag is located with str.find, a C-level literal scan, instead
+# of letting the regex engine backtrack across the agent log.
+_TAG_OPEN_RE = re.compile(r'<request_accomplished\s+success="true">', re.IGNORECASE)
+_TAG_CLOSE = '</request_accomplished>'
+_XML_TAG_RE = re.compile(r'<[^>]+>')
+# One-pass quote escaping for prompt embedding (vs chained .replace
+# copies of a message that can run to 3000 chars)
+_ESCAPE_TABLE = str.maketrans({'"': '\\"', "'": "\\'"})
+# Agent status chatter to reject - one alternation scan instead of a
+# .lower() copy plus a substring pass per blacklist entry
+_STATUS_RE = re.compile(
+    r'successfully|opened|navigated|completed|^(?:none|null|no message)$',
+    re.IGNORECASE
+)
+
+# Static prompt text built once at import - per-call work is just a
+# .format() of the small variable pieces instead of re-assembling
+# ~500 bytes of constant instructions in an f-string each time
+_NAV_TEMPLATE = (
+    'Open WhatsApp and navigate to chat "{chat}".\n\n'
+    'CRITICAL INSTRUCTIONS:\n'
+    '1. Open WhatsApp.\n'
+    '2. CHECK: If you are already inside a chat with someone else, CLICK THE BACK BUTTON immediately to go to the main list.\n'
+    '3. Once on the main list, click the Search icon.\n'
+    '4. Type "{chat}" and click their name.\n'
+    '5. If "{chat}" is already visible on the main list, just click it directly.\n'
+)
+
+_READ_STEPS = (
+    'Look at the current WhatsApp chat.\n'
+    'Find the LAST message at the bottom of the screen.\n'
+    'Read the message text carefully.\n\n'
+    'Return ONLY the message text using this EXACT format:\n'
+    '<request_accomplished success="true">THE_MESSAGE_TEXT_HERE</request_accomplished>\n\n'
+    'Example:\n'
+    '<request_accomplished success="true">check onion prices</request_accomplished>'
+)
+
+_SEND_TEMPLATE = (
+    'Send a message in WhatsApp.\n\n'
+    'STEPS:\n'
+    '1. Make sure you are in the chat with {chat}. If not, open WhatsApp and click "{chat}".\n'
+    '2. Click the message input field at the bottom.\n'
+    '3. Type this EXACT message:\n'
+    '"""\n{message}\n"""\n'
+    '4. Click the Send button (paper plane icon).\n'
+    '5. Wait 1 second for message to send.\n\n'
+    'IMPORTANT: After sending, immediately finish with:\n'
+    '<request_accomplished success="true">Message sent</request_accomplished>'
+)
+
 class WhatsAppHandler:
     def __init__(self, llm, max_steps=15):
         """Initialize WhatsApp Handler with safe runner"""
@@ -31,21 +89,40 @@ class WhatsAppHandler:
             config_full=self.config_full
         )
         
-        print("✅ WhatsApp Handler initialized with safe runner")
+        # Eager tasks (3.12+) run inline until their first real
+        # suspension - every runner.run() does sync setup (config pick,
+        # agent lookup) before touching I/O, so this skips a scheduler
+        # round-trip per agent call. No-op on older Pythons or when
+        # constructed outside a running loop.
+        try:
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        except (AttributeError, RuntimeError):
+            pass
+        
+        # chat_name -> monotonic timestamp of when we last confirmed
+        # being in that chat; lets repeat reads skip the whole
+        # open-chat agent run while the state is still fresh
+        self._chat_cache = {}
+        self._chat_ttl = 30.0
+        
+        # chat_name -> (monotonic timestamp, message); rapid re-polls
+        # of the same chat return the extracted text without another
+        # agent run
+        self._msg_cache = {}
+        self._msg_ttl = 5.0
+        
+        logger.info("✅ WhatsApp Handler initialized with safe runner")
     
     async def open_chat(self, chat_name: str) -> bool:
         """Open WhatsApp and navigate to specific chat"""
-        print(f"\n📱 Opening WhatsApp chat: '{chat_name}'...")
-        
-        task = (
-            f'Open WhatsApp and navigate to chat "{chat_name}".\n\n'
-            f'CRITICAL INSTRUCTIONS:\n'
-            f'1. Open WhatsApp.\n'
-            f'2. CHECK: If you are already inside a chat with someone else, CLICK THE BACK BUTTON immediately to go to the main list.\n'
-            f'3. Once on the main list, click the Search icon.\n'
-            f'4. Type "{chat_name}" and click their name.\n'
-            f'5. If "{chat_name}" is already visible on the main list, just click it directly.\n'
-        )
+        # Recently confirmed in this chat - skip the agent run entirely
+        if time.monotonic() - self._chat_cache.get(chat_name, 0) < self._chat_ttl:
+            logger.info("📱 Already in chat '%s' (cached)", chat_name)
+            return True
+        
+        logger.info("\n📱 Opening WhatsApp chat: '%s'...", chat_name)
+        
+        task = _NAV_TEMPLATE.format(chat=chat_name)
         
         output, err = await self.runner.run(
             goal=task,
@@ -54,10 +131,11 @@ class WhatsAppHandler:
         )
         
         if err:
-            print(f"❌ Error opening chat: {err}")
+            logger.error("❌ Error opening chat: %s", err)
             return False
         
-        print(f"✅ Chat '{chat_name}' opened")
+        self._chat_cache[chat_name] = time.monotonic()
+        logger.info("✅ Chat '%s' opened", chat_name)
         return True
     
     async def read_last_message(self, chat_name: str) -> str:
@@ -65,45 +143,70 @@ class WhatsAppHandler:
         Read the last message from WhatsApp chat.
         Uses output capture for reliable extraction.
         """
-        print(f"\n👀 Reading last message from '{chat_name}'...")
+        ts, cached_msg = self._msg_cache.get(chat_name, (0, None))
+        if cached_msg and time.monotonic() - ts < self._msg_ttl:
+            logger.info("👀 Last message for '%s' (cached): '%s'", chat_name, cached_msg)
+            return cached_msg
         
-        # First open the chat
-        if not await self.open_chat(chat_name):
-            return None
+        logger.info("\n👀 Reading last message from '%s'...", chat_name)
         
-        task = (
-            f'Look at the current WhatsApp chat.\n'
-            f'Find the LAST message at the bottom of the screen.\n'
-            f'Read the message text carefully.\n\n'
-            f'Return ONLY the message text using this EXACT format:\n'
-            f'<request_accomplished success="true">THE_MESSAGE_TEXT_HERE</request_accomplished>\n\n'
-            f'Example:\n'
-            f'<request_accomplished success="true">check onion prices</request_accomplished>'
+        # One composite agent run opens the chat AND reads the message,
+        # instead of paying two full agent lifecycles back to back.
+        # When the chat is known to be open already, the short
+        # read-only prompt suffices.
+        chat_is_open = time.monotonic() - self._chat_cache.get(chat_name, 0) < self._chat_ttl
+        composite = (
+            _NAV_TEMPLATE.format(chat=chat_name)
+            + '\nTHEN, once inside the chat:\n'
+            + _READ_STEPS
         )
-        
-        output, err = await self.runner.run(
-            goal=task,
-            timeout_s=40.0,  # Increased from 30
-            capture_stdout=True,
-            fast=False
-        )
-        
-        if err:
-            print(f"❌ Error reading message: {err}")
-            return None
-        
-        if not output:
-            print("⚠️ No output captured")
-            return None
-        
-        # Extract message from output
-        message = self._extract_message_from_output(output)
-        
+        if chat_is_open:
+            # Two-tier: reading one visible string doesn't need a
+            # reasoning-enabled 15-step agent - try the fast
+            # (reasoning-off, 6-step) config first. If that finds no
+            # message, the likeliest cause is that the device isn't
+            # actually in this chat any more (stale _chat_cache, e.g.
+            # after grocery apps ran), so the escalation retries with
+            # the full agent AND the navigation instructions.
+            attempts = (
+                (_READ_STEPS, 20.0, True),
+                (composite, 60.0, False),
+            )
+        else:
+            attempts = ((composite, 60.0, False),)
+
+        message = None
+        for goal, timeout_s, fast in attempts:
+            output, err = await self.runner.run(
+                goal=goal,
+                timeout_s=timeout_s,
+                capture_stdout=True,
+                fast=fast
+            )
+
+            if err:
+                logger.error("❌ Error reading message: %s", err)
+                continue
+
+            if not output:
+                logger.warning("⚠️ No output captured")
+                continue
+
+            # Extract message from output
+            message = self._extract_message_from_output(output)
+            if message:
+                break
+            logger.warning("⚠️ No message in output%s", " - retrying with full agent" if fast else "")
+
         if message:
-            print(f"✅ Message extracted: '{message}'")
+            now = time.monotonic()
+            self._msg_cache[chat_name] = (now, message)
+            # A successful read means we're sitting in this chat
+            self._chat_cache[chat_name] = now
+            logger.info("✅ Message extracted: '%s'", message)
             return message
         else:
-            print("⚠️ Could not extract message from output")
+            logger.warning("⚠️ Could not extract message from output")
             return None
     
     def _extract_message_from_output(self, output_text: str) -> str:
@@ -113,54 +216,58 @@ class WhatsAppHandler:
         """
         if not output_text:
             return None
-        
-        # Pattern for request_accomplished with success="true"
-        pattern = r'<request_accomplished\s+success="true">([^<]+)</request_accomplished>'
-        matches = re.findall(pattern, output_text, re.DOTALL | re.IGNORECASE)
-        
-        if matches:
-            # Take the last match
-            for match in reversed(matches):
-                msg = match.strip()
-                
-                # Clean any remaining XML tags
-                msg = re.sub(r'<[^>]+>', '', msg).strip()
-                
-                # Validate it's a real message (not a status message)
-                if (msg and 
-                    len(msg) < 200 and
-                    msg.lower() not in ['none', 'null', 'no message'] and
-                    not any(x in msg.lower() for x in [
-                        'successfully', 'opened', 'navigated', 'completed'
-                    ])):
-                    return msg
-        
-        return None
+
+        # Timed-out / failed runs never emit the tag at all - settle
+        # that with one C-level substring scan before any rfind loop
+        if '<request_accomplished' not in output_text:
+            return None
+
+        # Only the LAST tag matters, so scan backwards from the end
+        # with rfind instead of regex-walking the whole captured log
+        # (hundreds of KB of trajectory output) front to back
+        search_end = len(output_text)
+        while True:
+            close = output_text.rfind(_TAG_CLOSE, 0, search_end)
+            if close == -1:
+                return None
+            open_ = output_text.rfind('<request_accomplished', 0, close)
+            if open_ == -1:
+                return None
+            search_end = open_
+            
+            # Validate success="true" right at the open tag
+            m = _TAG_OPEN_RE.match(output_text, open_)
+            if not m or m.end() > close:
+                continue
+            
+            # Clean any remaining XML tags - most messages have none,
+            # and the '<' membership test is a cheap C scan
+            msg = output_text[m.end():close]
+            if '<' in msg:
+                msg = _XML_TAG_RE.sub('', msg)
+            msg = msg.strip()
+            
+            # Validate it's a real message (not a status message)
+            if msg and len(msg) < 200 and not _STATUS_RE.search(msg):
+                return msg
     
     async def send_message(self, chat_name: str, message: str) -> bool:
         """
         Send a message to WhatsApp chat.
         """
-        print(f"\n💬 Sending message to '{chat_name}'...")
-        
-        # Escape quotes and truncate if too long
-        safe_message = message.replace('"', '\\"').replace("'", "\\'")
-        if len(safe_message) > 3000:
-            safe_message = safe_message[:3000] + "\n\n... (truncated)"
-            print("⚠️ Message truncated to 3000 chars")
-        
-        task = (
-            f'Send a message in WhatsApp.\n\n'
-            f'STEPS:\n'
-            f'1. Make sure you are in the chat with {chat_name}. If not, open WhatsApp and click "{chat_name}".\n'
-            f'2. Click the message input field at the bottom.\n'
-            f'3. Type this EXACT message:\n'
-            f'"""\n{safe_message}\n"""\n'
-            f'4. Click the Send button (paper plane icon).\n'
-            f'5. Wait 1 second for message to send.\n\n'
-            f'IMPORTANT: After sending, immediately finish with:\n'
-            f'<request_accomplished success="true">Message sent</request_accomplished>'
-        )
+        logger.info("\n💬 Sending message to '%s'...", chat_name)
+        
+        # Sending changes the chat's last message - drop the stale read
+        self._msg_cache.pop(chat_name, None)
+        
+        # Truncate BEFORE escaping - truncating afterwards could cut a
+        # message mid-escape-sequence - then escape in one pass
+        if len(message) > 3000:
+            message = message[:3000] + "\n\n... (truncated)"
+            logger.warning("⚠️ Message truncated to 3000 chars")
+        safe_message = message.translate(_ESCAPE_TABLE)
+        
+        task = _SEND_TEMPLATE.format(chat=chat_name, message=safe_message)
         
         output, err = await self.runner.run(
             goal=task,
@@ -169,20 +276,27 @@ class WhatsAppHandler:
         )
         
         if err:
-            print(f"❌ Error sending message: {err}")
+            logger.error("❌ Error sending message: %s", err)
             return False
         
-        print("✅ Message sent successfully")
+        logger.info("✅ Message sent successfully")
         return True
     
-    async def go_home(self) -> bool:
-        """Return to home screen"""
-        print("🏠 Returning to home screen...")
+    def go_home(self):
+        """
+        Return to home screen. Sync shell returning the runner's
+        coroutine - callers still ``await handler.go_home()``, but no
+        extra coroutine frame is created per call. All call sites
+        ignore the result, so the (output, err) tuple replacing the old
+        bool is harmless.
+        """
+        logger.info("🏠 Returning to home screen...")
         
-        output, err = await self.runner.run(
+        # Leaving WhatsApp - any cached open-chat state is now stale
+        self._chat_cache.clear()
+        
+        return self.runner.run(
             goal='Press the Home button to go to the home screen.',
             timeout_s=10.0,
             fast=True
-        )
-        
-        return err is None
\ No newline at end of file
+        )
\ No newline at end of file